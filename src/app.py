@@ -3,14 +3,13 @@ from dash import html, dcc
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
 import pandas as pd
-from data_loader import load_and_clean_data, categorize_transactions, get_portfolio_history, fetch_price_data, calculate_portfolio_value, fetch_sector_data
+from data_loader import load_transactions, get_portfolio_history, fetch_price_data, calculate_portfolio_value, fetch_sector_data
 from metrics import calculate_xirr, calculate_cagr, calculate_net_invested, calculate_cost_basis, calculate_net_invested_breakdown, get_daily_cash_flows, calculate_performance_metrics, calculate_yearly_returns
 from components import create_card, create_portfolio_graph, create_stock_performance_chart, create_holdings_table, create_history_table, create_industry_allocation_chart, create_yearly_returns_chart
 
 # Load Data Globally (to avoid reloading on every callback)
 print("Loading data...")
-global_df = load_and_clean_data()
-global_df = categorize_transactions(global_df)
+global_df = load_transactions()
 
 # Fetch prices for all symbols once
 all_symbols = global_df['Symbol'].dropna().unique()
@@ -261,20 +260,16 @@ def update_dashboard(tab):
 # Helper to get holdings (moved from update_dashboard)
 def get_current_holdings(df):
     holdings_dict = {}
-    for _, row in df.iterrows():
-        if row['Category'] == 'BUY':
-            sym = row['Symbol']
-            qty = row['Quantity']
+    # Plain tuples over just the needed columns; iterrows() builds a Series per row
+    for category, sym, qty in df[['Category', 'Symbol', 'Quantity']].itertuples(index=False, name=None):
+        if category == 'BUY':
             holdings_dict[sym] = holdings_dict.get(sym, 0) + qty
-        elif row['Category'] == 'SELL':
-            sym = row['Symbol']
-            qty = abs(row['Quantity'])
-            holdings_dict[sym] = max(0, holdings_dict.get(sym, 0) - qty)
-        elif row['Category'] == 'Split':
-            sym = row['Symbol']
-            ratio = row['Quantity']
+        elif category == 'SELL':
+            holdings_dict[sym] = max(0, holdings_dict.get(sym, 0) - abs(qty))
+        elif category == 'Split':
+            # Quantity holds the split ratio
             if sym in holdings_dict:
-                holdings_dict[sym] = holdings_dict[sym] * ratio
+                holdings_dict[sym] = holdings_dict[sym] * qty
                 
     holdings_df = pd.DataFrame([holdings_dict])
     return holdings_df
@@ -45,7 +45,8 @@ def create_portfolio_graph(portfolio_value, net_invested):
         # Align both series on the same dates
         all_dates = portfolio_value.index.union(net_invested.index).sort_values()
         pv_aligned = portfolio_value.reindex(all_dates, method='ffill')
-        ni_aligned = net_invested.reindex(all_dates, method='ffill')
+        # Net invested only has points on flow days; nothing was invested before the first one
+        ni_aligned = net_invested.reindex(all_dates, method='ffill').fillna(0.0)
         pl_series = pv_aligned - ni_aligned
     
     # Portfolio Value Area Chart (Primary Y-axis)
@@ -98,7 +99,7 @@ def create_portfolio_graph(portfolio_value, net_invested):
             x=net_invested.index, 
             y=net_invested.values, 
             name='Net Invested', 
-            line=dict(dash='dash', color='#ffffff', width=2),
+            line=dict(dash='dash', color='#ffffff', width=2, shape='hv'),
             hovertemplate='<b>Net Invested:</b> $%{y:,.2f}<extra></extra>',
             hoverlabel=dict(
                 bgcolor='#1e1e1e',
@@ -310,17 +311,16 @@ def create_holdings_table(holdings_data):
     
     # Custom Rows with Conditional Styling
     rows = []
-    for _, row in df.iterrows():
-        pl = row['Unrealized P/L']
-        pl_pct = row['P/L %']
+    columns = ['Symbol', 'Quantity', 'Avg Cost', 'Current Price', 'Market Value', 'Unrealized P/L', 'P/L %']
+    for symbol, qty, avg_cost, price, value, pl, pl_pct in df[columns].itertuples(index=False, name=None):
         pl_color = "var(--apple-green)" if pl >= 0 else "var(--apple-red)"
         
         rows.append(html.Tr([
-            html.Td(row['Symbol'], style={'textAlign': 'left', 'fontWeight': '600'}),
-            html.Td(f"{row['Quantity']:,.2f}", style={'textAlign': 'right'}),
-            html.Td(f"${row['Avg Cost']:,.2f}", style={'textAlign': 'right'}),
-            html.Td(f"${row['Current Price']:,.2f}", style={'textAlign': 'right'}),
-            html.Td(f"${row['Market Value']:,.2f}", style={'textAlign': 'right'}),
+            html.Td(symbol, style={'textAlign': 'left', 'fontWeight': '600'}),
+            html.Td(f"{qty:,.2f}", style={'textAlign': 'right'}),
+            html.Td(f"${avg_cost:,.2f}", style={'textAlign': 'right'}),
+            html.Td(f"${price:,.2f}", style={'textAlign': 'right'}),
+            html.Td(f"${value:,.2f}", style={'textAlign': 'right'}),
             html.Td(f"${pl:+,.2f}", style={'textAlign': 'right', 'color': pl_color, 'fontWeight': '600'}),
             html.Td(f"{pl_pct:+.2%}", style={'textAlign': 'right', 'color': pl_color, 'fontWeight': '600'}),
         ]))
@@ -360,17 +360,17 @@ def create_history_table(history_data):
     
     # Custom Rows
     rows = []
-    for _, row in df.iterrows():
-        pl = row['Realized P/L']
+    columns = ['Date', 'Symbol', 'Qty', 'Sell Price', 'Cost Basis', 'Proceeds', 'Realized P/L']
+    for date, symbol, qty, sell_price, cost_basis, proceeds, pl in df[columns].itertuples(index=False, name=None):
         pl_color = "var(--apple-green)" if pl >= 0 else "var(--apple-red)"
         
         rows.append(html.Tr([
-            html.Td(row['Date'], style={'textAlign': 'left'}),
-            html.Td(row['Symbol'], style={'textAlign': 'left', 'fontWeight': '600'}),
-            html.Td(f"{row['Qty']:,.2f}", style={'textAlign': 'right'}),
-            html.Td(f"${row['Sell Price']:,.2f}", style={'textAlign': 'right'}),
-            html.Td(f"${row['Cost Basis']:,.2f}", style={'textAlign': 'right'}),
-            html.Td(f"${row['Proceeds']:,.2f}", style={'textAlign': 'right'}),
+            html.Td(date, style={'textAlign': 'left'}),
+            html.Td(symbol, style={'textAlign': 'left', 'fontWeight': '600'}),
+            html.Td(f"{qty:,.2f}", style={'textAlign': 'right'}),
+            html.Td(f"${sell_price:,.2f}", style={'textAlign': 'right'}),
+            html.Td(f"${cost_basis:,.2f}", style={'textAlign': 'right'}),
+            html.Td(f"${proceeds:,.2f}", style={'textAlign': 'right'}),
             html.Td(f"${pl:+,.2f}", style={'textAlign': 'right', 'color': pl_color, 'fontWeight': '600'}),
         ]))
 
@@ -7,9 +7,52 @@ import glob
 import os
 import json
 import time
+import threading
+import functools
+import hashlib
+import mmap
+import re
+from concurrent.futures import ThreadPoolExecutor
 
 DATA_PATH = 'data/Accounts_History*.csv'
 CACHE_PATH = 'data/sector_cache.json'
+PRICE_CACHE_DIR = 'data/.price_cache'
+PRICE_CACHE_TTL = 12 * 60 * 60  # seconds
+CLEANED_CACHE_PATH = 'data/.cleaned.parquet'
+CLEANED_CACHE_META = 'data/.cleaned.json'
+
+# Sector lookups: worker threads and global request rate (requests per second)
+SECTOR_FETCH_WORKERS = 8
+SECTOR_REQUESTS_PER_SEC = 4
+
+# Columns used downstream; everything else in the Fidelity export is skipped by the parser.
+# 'Currency' is kept for the column-misalignment fix in load_and_clean_data.
+NEEDED_COLUMNS = [
+    'Run Date', 'Settlement Date', 'Account', 'Action', 'Symbol', 'Description',
+    'Quantity', 'Price', 'Amount', 'Commission', 'Fees', 'Accrued Interest', 'Currency'
+]
+
+# Every column is read as text: dates are parsed with an explicit format and numeric
+# columns need '$' and ',' stripped before pd.to_numeric, so inference is wasted work
+FIDELITY_DTYPES = {col: str for col in NEEDED_COLUMNS}
+
+# Low-cardinality text columns stored as pandas categoricals (int codes instead of objects)
+CATEGORICAL_COLUMNS = ['Symbol', 'Action', 'Account']
+
+# Every value categorize_transactions can assign
+TRANSACTION_CATEGORIES = [
+    'DEPOSIT', 'WITHDRAWAL', 'BUY', 'SELL', 'DISTRIBUTION', 'DIVIDEND',
+    'REINVESTMENT', 'TAX', 'FEE', 'OTHER'
+]
+
+# Symbols that Yahoo can price (e.g. 'VTI', 'BRK.B'); CUSIPs and fund names are skipped
+PUBLIC_TICKER_RE = re.compile(r'[A-Z]{1,5}(?:[.-][A-Z])?')
+
+# Rows per read_csv chunk when loading history files
+CSV_CHUNK_SIZE = 50_000
+
+# Translation table that deletes '$' and ',' in a single pass
+_CURRENCY_CHARS = str.maketrans('', '', '$,')
 
 def load_and_clean_data(filepath_pattern=DATA_PATH):
     """
@@ -24,64 +67,68 @@ def load_and_clean_data(filepath_pattern=DATA_PATH):
     for filename in all_files:
         print(f"Loading {filename}...")
         try:
-            # Read lines and find where the header actually starts
-            with open(filename, 'r', encoding='utf-8-sig') as f:
-                raw_lines = f.readlines()
-            
-            # Find the header row (contains 'Run Date')
-            header_idx = 0
-            for i, line in enumerate(raw_lines):
-                if 'Run Date' in line:
-                    header_idx = i
-                    break
-            
-            lines = raw_lines[header_idx:]
+            # Find the header row (contains 'Run Date') with a byte search over a memory map
+            with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                header_pos = buf.find(b'Run Date')
+                header_idx = buf[:header_pos].count(b'\n') if header_pos != -1 else 0
             
-            # Fix lines with trailing commas (common in 401k rows)
-            fixed_lines = []
-            for line in lines:
-                # If line ends with just commas and newline, remove the extra trailing comma
-                if line.rstrip().endswith(',,'):
-                    line = line.rstrip()[:-1] + '\n'  # Remove one trailing comma
-                fixed_lines.append(line)
+            # Only parse the needed columns, all as text (see FIDELITY_DTYPES) to skip dtype
+            # inference. index_col=False together with usecols lets the parser ignore the
+            # extra trailing commas on 401k rows, so the file is streamed as-is.
+            # Large exports are parsed in chunks to bound the parser's working memory.
+            reader = pd.read_csv(
+                filename,
+                skiprows=header_idx,
+                encoding='utf-8-sig',
+                index_col=False,
+                usecols=lambda c: c.strip() in NEEDED_COLUMNS,
+                dtype=FIDELITY_DTYPES,
+                parse_dates=False,
+                chunksize=CSV_CHUNK_SIZE
+            )
             
-            # Read the fixed CSV from string
-            from io import StringIO
-            temp_df = pd.read_csv(StringIO(''.join(fixed_lines)), low_memory=False)
-            
-            # If there are extra columns, drop the last one if it's all NaN
-            if temp_df.shape[1] > 18:
-                # Check if last column is all NaN
-                if temp_df.iloc[:, -1].isna().all():
-                    temp_df = temp_df.iloc[:, :-1]
+            file_chunks = list(reader)
             
             # Fix column misalignment/naming based on observation
-            if 'Quantity' in temp_df.columns and temp_df['Quantity'].astype(str).str.contains('USD').any():
-                temp_df = temp_df.rename(columns={
-                    'Quantity': 'Currency_Name',
-                    'Currency': 'Price',
-                    'Price': 'Quantity'
-                })
+            # The layout is a property of the whole export: decide it from every chunk's
+            # Quantity column first, then give all chunks of the file the same rename
+            swapped = any(
+                'Quantity' in chunk.columns and chunk['Quantity'].astype(str).str.contains('USD', regex=False).any()
+                for chunk in file_chunks
+            )
+            if swapped:
+                file_chunks = [
+                    chunk.rename(columns={
+                        'Quantity': 'Currency_Name',
+                        'Currency': 'Price',
+                        'Price': 'Quantity'
+                    })
+                    for chunk in file_chunks
+                ]
             
-            df_list.append(temp_df)
+            df_list.extend(file_chunks)
         except Exception as e:
             print(f"Error loading {filename}: {e}")
             
     if not df_list:
         return pd.DataFrame()
         
-    df = pd.concat(df_list, ignore_index=True)
+    # copy=False skips the eager copy; the per-file frames are released before dedupe/filtering
+    df = pd.concat(df_list, ignore_index=True, copy=False)
+    del df_list
     
     # Drop duplicates (exact row matches)
     df = df.drop_duplicates()
     
     # Drop the last footer rows (usually contain legal text)
     # We can identify them by checking if 'Run Date' is NaN or doesn't look like a date
-    df = df.dropna(subset=['Run Date'])
-    df = df[df['Run Date'].str.match(r'\d{2}/\d{2}/\d{4}', na=False)]
+    # Parse once and keep only rows whose Run Date is a valid date
+    run_date = pd.to_datetime(df['Run Date'], format='%m/%d/%Y', errors='coerce')
+    valid = run_date.notna()
+    df = df.loc[valid].copy()
 
     # Convert date columns
-    df['Run Date'] = pd.to_datetime(df['Run Date'], format='%m/%d/%Y')
+    df['Run Date'] = run_date[valid]
     df['Settlement Date'] = pd.to_datetime(df['Settlement Date'], format='%m/%d/%Y', errors='coerce')
 
     # Clean Symbol column and handle 401k contributions
@@ -101,7 +148,7 @@ def load_and_clean_data(filepath_pattern=DATA_PATH):
         if col in df.columns:
             # Remove '$' and ',' if present
             if df[col].dtype == 'object':
-                df[col] = df[col].astype(str).str.replace('$', '', regex=False).str.replace(',', '', regex=False)
+                df[col] = df[col].astype(str).str.translate(_CURRENCY_CHARS)
             df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
 
     # Calculate implicit price for transactions where it's missing (common in 401k)
@@ -109,46 +156,92 @@ def load_and_clean_data(filepath_pattern=DATA_PATH):
     if mask.any():
         df.loc[mask, 'Price'] = (df.loc[mask, 'Amount'] / df.loc[mask, 'Quantity']).abs()
 
+    # Shrink low-cardinality text columns and speed up comparisons/groupby on them
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
     return df
 
 def categorize_transactions(df):
     """
     Adds a 'Transaction Category' column to the dataframe.
     """
-    def get_category(row):
-        action = str(row['Action']).upper()
-        description = str(row['Description']).upper()
-        
-        if "ELECTRONIC FUNDS TRANSFER" in action or "ELECTRONIC FUNDS TRANSFER" in description:
-            if row['Amount'] > 0:
-                return "DEPOSIT"
-            else:
-                return "WITHDRAWAL"
-        elif "JOURNALED SPP PURCHASE CREDIT" in description or "JOURNALED SPP PURCHASE CREDIT" in action:
-            return "DEPOSIT"
-        elif "YOU BOUGHT" in action or "CONTRIBUTIONS" in action:
-            return "BUY"  # 401k contributions are purchases
-        elif "YOU SOLD" in action:
-            return "SELL"
-        elif "DISTRIBUTION" in action:
-            return "DISTRIBUTION"  # Stock split distributions
-        elif "DIVIDEND" in action:
-            return "DIVIDEND"
-        elif "REINVESTMENT" in action:
-            return "REINVESTMENT"
-        elif "FOREIGN TAX" in action:
-            return "TAX"
-        elif "ADVISORY FEE" in action:
-            return "FEE"
-        else:
-            return "OTHER"
-
-    df['Category'] = df.apply(get_category, axis=1)
+    action = df['Action'].astype(str).str.upper()
+    description = df['Description'].astype(str).str.upper()
+    
+    def has(col, text):
+        return col.str.contains(text, regex=False)
+    
+    eft = has(action, "ELECTRONIC FUNDS TRANSFER") | has(description, "ELECTRONIC FUNDS TRANSFER")
+    
+    code = {name: i for i, name in enumerate(TRANSACTION_CATEGORIES)}
+    
+    # Conditions in priority order; the first match wins
+    conditions = [
+        eft,
+        has(description, "JOURNALED SPP PURCHASE CREDIT") | has(action, "JOURNALED SPP PURCHASE CREDIT"),
+        has(action, "YOU BOUGHT") | has(action, "CONTRIBUTIONS"),  # 401k contributions are purchases
+        has(action, "YOU SOLD"),
+        has(action, "DISTRIBUTION"),  # Stock split distributions
+        has(action, "DIVIDEND"),
+        has(action, "REINVESTMENT"),
+        has(action, "FOREIGN TAX"),
+        has(action, "ADVISORY FEE"),
+    ]
+    choices = [
+        np.where(df['Amount'] > 0, code["DEPOSIT"], code["WITHDRAWAL"]),
+        code["DEPOSIT"],
+        code["BUY"],
+        code["SELL"],
+        code["DISTRIBUTION"],
+        code["DIVIDEND"],
+        code["REINVESTMENT"],
+        code["TAX"],
+        code["FEE"],
+    ]
+    
+    # Emit a categorical column directly from the category codes
+    codes = np.select(conditions, choices, default=code["OTHER"])
+    df['Category'] = pd.Categorical.from_codes(codes, categories=TRANSACTION_CATEGORIES)
+    return df
+
+def load_transactions(filepath_pattern=DATA_PATH):
+    """
+    Returns the cleaned and categorized transactions, reusing the Parquet copy in
+    CLEANED_CACHE_PATH when none of the input CSVs have changed since it was written.
+    """
+    all_files = sorted(glob.glob(filepath_pattern))
+    key = hashlib.sha1(repr([(f, os.path.getmtime(f), os.path.getsize(f)) for f in all_files]).encode()).hexdigest()
+    
+    if os.path.exists(CLEANED_CACHE_PATH) and os.path.exists(CLEANED_CACHE_META):
+        try:
+            with open(CLEANED_CACHE_META, 'r') as f:
+                meta = json.load(f)
+            if meta.get('key') == key:
+                return pd.read_parquet(CLEANED_CACHE_PATH)
+        except Exception as e:
+            print(f"Error loading cleaned data cache: {e}")
+    
+    df = load_and_clean_data(filepath_pattern)
+    if df.empty:
+        return df
+    df = categorize_transactions(df)
+    
+    try:
+        df.to_parquet(CLEANED_CACHE_PATH, compression='snappy')
+        with open(CLEANED_CACHE_META, 'w') as f:
+            json.dump({'key': key, 'files': all_files}, f, indent=4)
+    except Exception as e:
+        print(f"Error saving cleaned data cache: {e}")
+    
     return df
 
-def get_portfolio_history(df):
+def get_portfolio_history(df, sample_dates=None):
     """
     Reconstructs the portfolio holdings and value over time.
+    sample_dates limits the snapshots to the given dates (e.g. weekly chart ticks);
+    by default every business day and transaction day since the first transaction.
     Note: Stock splits are already reflected in CSV transactions (e.g., DISTRIBUTION entries).
     Yahoo Finance also returns split-adjusted prices, so no manual adjustment is needed.
     """
@@ -177,81 +270,61 @@ def get_portfolio_history(df):
     if not valid_symbols:
         return pd.DataFrame(), []
 
-    # Date range from first transaction to today
-    start_date = df['Run Date'].min()
-    end_date = datetime.now()
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    # Initialize holdings and cash
-    current_holdings = {s: 0.0 for s in symbols}
-    cash_balance = 0.0
-    
-    # Store history: List of dicts, then convert to DF
-    history_list = []
-    
-    # Group transactions by date for faster access
-    tx_by_date = df.groupby(df['Run Date'].dt.date)
-    
-    for date in date_range:
-        date_date = date.date()
-        
-        # Process Transactions
-        if date_date in tx_by_date.groups:
-            day_txs = tx_by_date.get_group(date_date)
-            for _, row in day_txs.iterrows():
-                symbol = row['Symbol']
-                action = row['Category']
-                qty = row['Quantity']
-                amount = row['Amount']
-                
-                # Update Cash Balance
-                # DEPOSIT (+), WITHDRAWAL (-), SELL (+), DIVIDEND (+), TAX (-), FEE (-)
-                # BUY (-), REINVESTMENT (- but usually net 0)
-                
-                if action == 'DEPOSIT':
-                    cash_balance += amount
-                elif action == 'WITHDRAWAL':
-                    cash_balance += amount # amount is negative
-                elif action == 'SELL':
-                    cash_balance += amount # amount is positive
-                    if symbol in current_holdings:
-                        current_holdings[symbol] += qty # qty is negative
-                elif action == 'BUY':
-                    # For 401k, BUY is often the contribution itself (no external DEPOSIT sometimes)
-                    # Let's check Account
-                    if row.get('Account') == 'MICROSOFT 401K PLAN':
-                        # In 401k, BUY is the "inflow"
-                        # Securities increase, but cash doesn't decrease (it was never there as cash)
-                        pass 
-                    else:
-                        cash_balance += amount # amount is negative
-                        
-                    if symbol not in current_holdings:
-                        current_holdings[symbol] = 0.0
-                    current_holdings[symbol] += qty
-                elif action == 'DIVIDEND':
-                    cash_balance += amount
-                elif action == 'REINVESTMENT':
-                    # REINVESTMENT is BUY using DIVIDEND. Net cash change is 0.
-                    # Securities increase.
-                    if symbol not in current_holdings:
-                        current_holdings[symbol] = 0.0
-                    current_holdings[symbol] += qty
-                elif action == 'DISTRIBUTION':
-                    if symbol not in current_holdings:
-                        current_holdings[symbol] = 0.0
-                    current_holdings[symbol] += qty
-                elif action in ['TAX', 'FEE']:
-                    cash_balance += amount
-                    
-        # Store daily snapshot
-        snapshot = current_holdings.copy()
-        snapshot['Cash'] = cash_balance
-        snapshot['Date'] = date
-        history_list.append(snapshot)
-    
-    holdings_df = pd.DataFrame(history_list).set_index('Date')
-    holdings_df = holdings_df.fillna(0)
+    if sample_dates is None:
+        # Date range from first transaction to today
+        # Markets are closed on weekends, so only business days are tracked, plus any day
+        # that actually has a transaction (so cash flows still line up with a snapshot)
+        start_date = df['Run Date'].min()
+        end_date = datetime.now()
+        sample_dates = pd.date_range(start=start_date, end=end_date, freq='B')
+        sample_dates = sample_dates.union(pd.DatetimeIndex(df['Run Date'].dt.normalize().unique()))
+    else:
+        sample_dates = pd.DatetimeIndex(sample_dates).sort_values()
+    
+    # Signed per-row changes, computed once up front instead of branching per row
+    # Holdings: BUY/REINVESTMENT/DISTRIBUTION add shares, SELL removes them (qty is negative)
+    # Cash: DEPOSIT (+), WITHDRAWAL (-), SELL (+), DIVIDEND (+), TAX (-), FEE (-), BUY (-)
+    # REINVESTMENT is a BUY using a DIVIDEND, so its net cash change is 0.
+    # For 401k, BUY is the contribution itself: securities increase, but cash was never there.
+    category = df['Category']
+    if 'Account' in df.columns:
+        is_401k = df['Account'] == 'MICROSOFT 401K PLAN'
+    else:
+        is_401k = pd.Series(False, index=df.index)
+    df['HoldingDelta'] = np.where(
+        category.isin(['BUY', 'REINVESTMENT', 'DISTRIBUTION', 'SELL']), df['Quantity'], 0.0
+    )
+    df['CashDelta'] = np.where(
+        category.isin(['DEPOSIT', 'WITHDRAWAL', 'SELL', 'DIVIDEND', 'TAX', 'FEE'])
+        | ((category == 'BUY') & ~is_401k),
+        df['Amount'], 0.0
+    )
+    
+    # Sum the deltas per transaction day and symbol, then cumulative-sum them to get
+    # the running balances after each day that had activity (a sparse event table)
+    tx_day = df['Run Date'].dt.normalize()
+    cash_events = df.groupby(tx_day)['CashDelta'].sum()
+    event_dates = cash_events.index
+    holding_events = (
+        df.groupby([tx_day, 'Symbol'], observed=True)['HoldingDelta'].sum()
+        .unstack(fill_value=0.0)
+        .reindex(index=event_dates, columns=symbols, fill_value=0.0)
+    )
+    cum_holdings = holding_events.cumsum().to_numpy()
+    cum_cash = cash_events.cumsum().to_numpy()
+    
+    # Snapshot each sample date from the last event on or before it; dates before
+    # the first transaction hold nothing
+    idx = event_dates.searchsorted(sample_dates, side='right') - 1
+    before_start = idx < 0
+    idx[before_start] = 0
+    holdings = cum_holdings[idx]
+    cash = cum_cash[idx]
+    holdings[before_start] = 0.0
+    cash[before_start] = 0.0
+    
+    holdings_df = pd.DataFrame(holdings, index=pd.DatetimeIndex(sample_dates, name='Date'), columns=symbols)
+    holdings_df['Cash'] = cash
     return holdings_df, valid_symbols
 
 def get_transaction_prices(df):
@@ -269,10 +342,39 @@ def get_transaction_prices(df):
     
     # Pivot to have Dates as Index and Symbols as Columns
     # If multiple txs on same day for same symbol, take the mean or last. Let's take last.
-    tx_prices = price_txs.pivot_table(index='Run Date', columns='Symbol', values='Price', aggfunc='last')
+    tx_prices = price_txs.pivot_table(index='Run Date', columns='Symbol', values='Price', aggfunc='last', observed=True)
+    # Plain string columns so they line up with the market data columns
+    tx_prices.columns = tx_prices.columns.astype(str)
+    tx_prices.columns.name = 'Symbol'
     
     return tx_prices
 
+@functools.lru_cache(maxsize=128)
+def _ticker(sym):
+    """
+    Returns a shared yf.Ticker per symbol so repeated lookups in this process
+    reuse the data the Ticker has already fetched.
+    """
+    return yf.Ticker(sym)
+
+def _rate_limiter(rate):
+    """
+    Returns a function that blocks until the next request slot, spacing calls
+    at most `rate` per second across all threads.
+    """
+    lock = threading.Lock()
+    interval = 1.0 / rate
+    next_slot = [time.monotonic()]
+    
+    def wait():
+        with lock:
+            now = time.monotonic()
+            slot = max(now, next_slot[0])
+            next_slot[0] = slot + interval
+        time.sleep(max(0.0, slot - now))
+    
+    return wait
+
 def fetch_sector_data(symbols):
     """
     Fetches sector information for the given symbols with caching.
@@ -290,10 +392,8 @@ def fetch_sector_data(symbols):
         except Exception as e:
             print(f"Error loading sector cache: {e}")
             
-    # Identify missing symbols
-    # Symbols already in cache (even if Unknown) should NOT be re-fetched every time
-    # Also ignore 'nan' or empty strings
-    missing_symbols = [s for s in symbols if s and str(s).lower() != 'nan' and s not in cache]
+    # Ignore 'nan' or empty strings
+    clean_syms = {s for s in symbols if s and str(s).strip() and str(s).lower() != 'nan'}
     
     # Manual Mapping for ETFs and common symbols that yfinance fails on
     ETF_SECTORS = {
@@ -315,13 +415,13 @@ def fetch_sector_data(symbols):
     }
     
     # Pre-populate from manual mapping if missing
-    for sym in symbols:
-        if sym in ETF_SECTORS and sym not in cache:
-            cache[sym] = ETF_SECTORS[sym]
-            updated = True
-            
-    # Re-check missing after manual mapping
-    missing_symbols = [s for s in missing_symbols if s not in cache]
+    manual = {s: ETF_SECTORS[s] for s in clean_syms & ETF_SECTORS.keys() if s not in cache}
+    if manual:
+        cache.update(manual)
+        updated = True
+    
+    # Symbols already in cache (even if Unknown) should NOT be re-fetched every time
+    missing_symbols = sorted(clean_syms - cache.keys(), key=str)
     
     if not missing_symbols:
         # One-time cleanup: remove 'nan' if it exists in cache
@@ -335,24 +435,24 @@ def fetch_sector_data(symbols):
         
     print(f"Fetching sector data for {len(missing_symbols)} symbols...")
     
-    # Fetch missing data
-    for i, sym in enumerate(missing_symbols):
+    # Fetch missing data in parallel, with a shared rate limit to stay clear of Yahoo throttling
+    wait_for_slot = _rate_limiter(SECTOR_REQUESTS_PER_SEC)
+    
+    def fetch_one(sym):
+        wait_for_slot()
         try:
-            print(f"Fetching sector for {sym} ({i+1}/{len(missing_symbols)})...")
-            ticker = yf.Ticker(sym)
-            info = ticker.info
-            sector = info.get('sector', 'Unknown')
-            cache[sym] = sector
-            updated = True
-            
-            # Sleep to avoid rate limits
-            time.sleep(1.2) 
-            
+            print(f"Fetching sector for {sym}...")
+            info = _ticker(sym).info
+            return sym, info.get('sector', 'Unknown')
         except Exception as e:
             print(f"Error fetching sector for {sym}: {e}")
-            cache[sym] = 'Unknown' # Mark as Unknown so we don't retry forever
+            return sym, 'Unknown' # Mark as Unknown so we don't retry forever
+    
+    with ThreadPoolExecutor(max_workers=min(SECTOR_FETCH_WORKERS, len(missing_symbols))) as executor:
+        # Results are written to the cache from this thread only
+        for sym, sector in executor.map(fetch_one, missing_symbols):
+            cache[sym] = sector
             updated = True
-            time.sleep(1)
             
     # Save cache if updated
     if updated:
@@ -366,6 +466,40 @@ def fetch_sector_data(symbols):
             
     return cache
 
+def _download_close_prices(symbols, start_date):
+    """
+    Downloads daily close prices from yfinance, reusing an on-disk copy
+    (keyed on the symbols and start date) if it is younger than PRICE_CACHE_TTL.
+    """
+    key = hashlib.md5(json.dumps([sorted(symbols), str(start_date)]).encode()).hexdigest()
+    data_path = os.path.join(PRICE_CACHE_DIR, f"{key}.parquet")
+    meta_path = os.path.join(PRICE_CACHE_DIR, f"{key}.json")
+    
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if time.time() - meta['fetched_at'] < PRICE_CACHE_TTL:
+                return pd.read_parquet(data_path)
+        except Exception as e:
+            print(f"Error loading price cache: {e}")
+    
+    market_data = yf.download(symbols, start=start_date, progress=False, threads=True)['Close']
+    if isinstance(market_data, pd.Series):
+        market_data = market_data.to_frame(name=symbols[0])
+    
+    # Don't cache a failed (empty) download
+    if not market_data.empty:
+        try:
+            os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+            market_data.to_parquet(data_path, compression='snappy')
+            with open(meta_path, 'w') as f:
+                json.dump({'fetched_at': time.time(), 'symbols': list(symbols), 'start': str(start_date)}, f, indent=4)
+        except Exception as e:
+            print(f"Error saving price cache: {e}")
+    
+    return market_data
+
 def fetch_price_data(symbols, start_date, tx_df=None):
     """
     Fetches historical price data for the given symbols.
@@ -392,13 +526,17 @@ def fetch_price_data(symbols, start_date, tx_df=None):
         return pd.DataFrame()
 
     # 1. Fetch Market Data
-    try:
-        market_data = yf.download(valid_symbols, start=start_date, progress=False)['Close']
-        if isinstance(market_data, pd.Series):
-            market_data = market_data.to_frame(name=valid_symbols[0])
-    except Exception as e:
-        print(f"Error fetching market data: {e}")
-        market_data = pd.DataFrame()
+    # Only request symbols that look like exchange tickers; CUSIPs and 401k fund
+    # names always fail on Yahoo and just add retries to the batch download.
+    # Those fall through to the manual and transaction prices below.
+    public_tickers = [s for s in valid_symbols if PUBLIC_TICKER_RE.fullmatch(s)]
+    market_data = pd.DataFrame()
+    if public_tickers:
+        try:
+            market_data = _download_close_prices(public_tickers, start_date)
+        except Exception as e:
+            print(f"Error fetching market data: {e}")
+            market_data = pd.DataFrame()
     
     # 1.5 Add manual prices for 401k mutual funds that yfinance can't fetch
     # These prices are from the actual brokerage account as of Nov 23, 2025
@@ -410,7 +548,7 @@ def fetch_price_data(symbols, start_date, tx_df=None):
     # Initialize market_data if empty
     today = datetime.now()
     if market_data.empty:
-        market_data = pd.DataFrame(index=pd.date_range(start=start_date, end=today, freq='D'))
+        market_data = pd.DataFrame(index=pd.date_range(start=start_date, end=today, freq='B'))
 
     # Only fill the LATEST price as a benchmark if the symbol is missing from YF
     for symbol, price in manual_prices.items():
@@ -456,30 +594,25 @@ def fetch_price_data(symbols, start_date, tx_df=None):
         
     # Process Tx Prices (already has original symbols)
     if not tx_prices.empty:
-        # Combine: Market data takes precedence? 
-        # Actually, for future dates, Market Data won't exist.
-        # So combine_first is good: df1.combine_first(df2) updates nulls in df1 with values from df2.
-        # But we want to extend the index too.
-        
-        # Let's reindex both to the full union of dates
-        all_dates = combined_prices.index.union(tx_prices.index).sort_values()
-        
-        combined_prices = combined_prices.reindex(all_dates)
-        tx_prices = tx_prices.reindex(all_dates)
+        # Market Data (Yahoo) may stop before the latest transactions, so for each
+        # symbol take the latest known price from either source, preferring the
+        # market close when both exist on the same day. merge_asof does the
+        # "latest price on or before each date" lookup on the sparse observations
+        # instead of reindexing both frames to the full union and combine_first'ing.
+        all_dates = combined_prices.index.union(tx_prices.index)
+        target = pd.DataFrame({'Date': all_dates})
         
-        # Fill Market Data gaps with Tx Prices?
-        # Or better: Use Market Data if available, else Tx Price.
-        # But Tx Price is sparse (only on tx days).
-        # So we should ffill Tx Prices first?
-        # No, we want the "Latest known price".
+        merged = {}
+        for sym in combined_prices.columns.union(tx_prices.columns):
+            observed = pd.Series(dtype=float)
+            if sym in combined_prices.columns:
+                observed = combined_prices[sym].dropna()
+            if sym in tx_prices.columns:
+                observed = observed.combine_first(tx_prices[sym].dropna())
+            observed = pd.DataFrame({'Date': observed.index, 'Price': observed.to_numpy(dtype=float)})
+            merged[sym] = pd.merge_asof(target, observed, on='Date', direction='backward')['Price'].to_numpy()
         
-        # Strategy:
-        # 1. Create a master timeline.
-        # 2. Fill with Market Data.
-        # 3. Fill remaining NaNs with Transaction Data.
-        # 4. Forward fill everything.
-        
-        combined_prices = combined_prices.combine_first(tx_prices)
+        combined_prices = pd.DataFrame(merged, index=all_dates)
         
     # Forward fill to propagate last known price
     combined_prices = combined_prices.ffill()
@@ -501,7 +634,12 @@ def calculate_portfolio_value(holdings_df, price_df):
     }
     reverse_map = {v: k for k, v in ticker_map.items()}
     prices = prices.rename(columns=reverse_map)
-    
+
+    # Renaming can leave two columns for one symbol (e.g. SPLG market data and SPYM transaction prices).
+    # Collapse them, preferring the first non-null price, so each holding is valued once.
+    if prices.columns.has_duplicates:
+        prices = prices.T.groupby(level=0, sort=False).first().T
+
     # Ensure we only use columns present in both for security value calculation
     ticker_cols = list(set(holdings.columns) & set(prices.columns))
     ticker_cols = [c for c in ticker_cols if c != 'Cash']
@@ -513,23 +651,23 @@ def calculate_portfolio_value(holdings_df, price_df):
     
     # Value of securities
     if ticker_cols:
-        val_df = holdings[ticker_cols] * prices[ticker_cols]
-        securities_value = val_df.sum(axis=1)
+        # Fused multiply-and-reduce over aligned arrays (no intermediate DataFrame).
+        # Missing prices count as zero, matching the NaN-skipping sum.
+        h = holdings[ticker_cols].to_numpy(dtype=np.float64, copy=False)
+        p = np.nan_to_num(prices[ticker_cols].to_numpy(dtype=np.float64, copy=False), nan=0.0)
+        value = np.einsum('ij,ij->i', h, p)
     else:
-        securities_value = pd.Series(0.0, index=common_dates)
+        value = np.zeros(len(common_dates))
     
     # Add cash (use original holdings_df where Cash is guaranteed to exist if tracked)
     if 'Cash' in holdings_df.columns:
-        portfolio_value = securities_value + holdings_df.loc[common_dates, 'Cash']
-    else:
-        portfolio_value = securities_value
+        value += holdings_df.loc[common_dates, 'Cash'].to_numpy(dtype=np.float64)
             
-    return portfolio_value
+    return pd.Series(value, index=common_dates)
 
 if __name__ == "__main__":
     # Test run
-    df = load_and_clean_data()
-    df = categorize_transactions(df)
+    df = load_transactions()
     print("Data loaded and categorized.")
     print(df[['Run Date', 'Action', 'Category', 'Amount']].head())
     
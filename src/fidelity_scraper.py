@@ -1,15 +1,112 @@
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import os
 import re
 import pandas as pd
 import glob
 from datetime import datetime, timedelta
-import time
 import shutil
+import codecs
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 # Paths
 DATA_DIR = os.path.join(os.getcwd(), 'data')
 USER_DATA_DIR = os.path.join(os.getcwd(), '.fidelity_session')
+# Cookies + localStorage saved after a successful login, so later runs can skip it
+STATE_PATH = os.path.join(os.getcwd(), '.fidelity_state.json')
+# Latest date per history file, keyed on file name, so unchanged files aren't re-read
+INDEX_PATH = os.path.join(DATA_DIR, '.index.json')
+
+ACTIVITY_URL = "https://digital.fidelity.com/ftgw/digital/portfolio/activity"
+
+# Runs with a saved session don't need a visible window
+HEADLESS_ARGS = ["--disable-blink-features=AutomationControlled", "--disable-gpu"]
+
+# Resource types the scraper never needs; skipping them cuts page load time.
+# Fonts are still loaded since some of the icon buttons we look for are glyphs.
+BLOCKED_RESOURCE_TYPES = {'image', 'media'}
+
+# Default wait for locators/actions and for page navigations (ms). Failing fast on a
+# selector that no longer matches beats waiting out Playwright's 30s default.
+DEFAULT_TIMEOUT_MS = int(os.environ.get("FIDELITY_TIMEOUT_MS", "15000"))
+NAVIGATION_TIMEOUT_MS = 20000
+# How long to wait for the results loading indicator to appear after Apply
+SPINNER_APPEAR_TIMEOUT_MS = 5000
+
+# A data row starts with its Run Date (MM/DD/YYYY); header and footer lines don't
+_ROW_DATE_RE = re.compile(rb'^(\d{2}/\d{2}/\d{4}),', re.M)
+# Bytes read from each end of a history file to find its first and last rows
+EDGE_READ_BYTES = 8192
+
+def _read_edge_row_dates(path):
+    """
+    Returns the latest Run Date of the first and last data rows, or None if neither parses.
+    Exports are sorted by date, so the file's latest date is at one of its two ends;
+    only one small read from the head and one from the tail are needed.
+    """
+    with open(path, 'rb') as fh:
+        head = fh.read(EDGE_READ_BYTES)
+        size = fh.seek(0, os.SEEK_END)
+        tail_start = max(0, size - EDGE_READ_BYTES)
+        fh.seek(tail_start)
+        tail = fh.read()
+    if tail_start > 0:
+        # Drop the partial line we seeked into
+        tail = tail[tail.find(b'\n') + 1:]
+    
+    edges = []
+    first = _ROW_DATE_RE.search(head)
+    if first:
+        edges.append(first.group(1))
+    last = None
+    for last in _ROW_DATE_RE.finditer(tail):
+        pass
+    if last:
+        edges.append(last.group(1))
+    
+    dates = []
+    for raw in edges:
+        try:
+            dates.append(datetime.strptime(raw.decode(), '%m/%d/%Y'))
+        except ValueError:
+            pass
+    return max(dates) if dates else None
+
+def _max_date_for_file(f):
+    """Returns the latest Run Date in one history file, or None."""
+    try:
+        # Fast path: only read the first and last data rows
+        max_date = _read_edge_row_dates(f)
+        if max_date is None:
+            # Fall back to scanning the whole 'Run Date' column. Read it as text (the
+            # dates are parsed below anyway) and with index_col=False so the trailing
+            # commas on 401k rows don't shift the columns
+            df = pd.read_csv(f, skiprows=2, usecols=['Run Date'], dtype=str,
+                             index_col=False, encoding='utf-8-sig')
+            df['Run Date'] = pd.to_datetime(df['Run Date'], format='%m/%d/%Y', errors='coerce')
+            max_date = df['Run Date'].max()
+        if pd.notnull(max_date):
+            return max_date
+    except Exception as e:
+        print(f"Error reading {f}: {e}")
+    return None
+
+def _load_index():
+    """Loads the per-file latest-date cache ({filename: {mtime_ns, size, max_date}})."""
+    if os.path.exists(INDEX_PATH):
+        try:
+            with open(INDEX_PATH, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading file index: {e}")
+    return {}
+
+def _save_index(index):
+    try:
+        with open(INDEX_PATH, 'w') as f:
+            json.dump(index, f, indent=4)
+    except Exception as e:
+        print(f"Error saving file index: {e}")
 
 def get_latest_transaction_date():
     """Finds the latest transaction date from existing CSVs in the data directory."""
@@ -17,50 +114,114 @@ def get_latest_transaction_date():
     if not files:
         return datetime(2024, 1, 1) # Default start date if no data exists
     
+    # History files don't change once written, so reuse the date from the index
+    # unless the file's mtime or size differs from when it was last scanned
+    index = _load_index()
     dates = []
+    stale = {}
     for f in files:
-        try:
-            # We only need the first few rows to check 'Run Date'
-            df = pd.read_csv(f, skiprows=2, usecols=['Run Date'])
-            df['Run Date'] = pd.to_datetime(df['Run Date'], format='%m/%d/%Y', errors='coerce')
-            max_date = df['Run Date'].max()
-            if pd.notnull(max_date):
-                dates.append(max_date)
-        except Exception as e:
-            print(f"Error reading {f}: {e}")
+        st = os.stat(f)
+        name = os.path.basename(f)
+        entry = index.get(name)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            if entry['max_date']:
+                dates.append(datetime.fromisoformat(entry['max_date']))
+        else:
+            stale[f] = st
+    
+    if stale:
+        # Files are independent and the work is mostly disk reads, so scan them in parallel
+        with ThreadPoolExecutor(max_workers=min(8, len(stale))) as ex:
+            for f, max_date in zip(stale, ex.map(_max_date_for_file, stale)):
+                st = stale[f]
+                index[os.path.basename(f)] = {
+                    'mtime_ns': st.st_mtime_ns,
+                    'size': st.st_size,
+                    'max_date': max_date.isoformat() if max_date is not None else None,
+                }
+                if max_date is not None:
+                    dates.append(max_date)
+        _save_index(index)
             
     return max(dates) if dates else datetime(2024, 1, 1)
 
+# The first footer line, and blank lines, as byte patterns over the whole file
+_FOOTER_RE = re.compile(rb'^.*(?:The data and information in this report|Date downloaded)', re.M)
+_BLANK_LINE_RE = re.compile(rb'^[ \t\r]*\n', re.M)
+
 def clean_fidelity_csv(input_path, output_path):
     """Removes the footer from the Fidelity CSV and saves it."""
-    with open(input_path, 'r', encoding='utf-8-sig') as f:
-        lines = f.readlines()
+    with open(input_path, 'rb') as f:
+        buf = f.read()
     
-    # Fidelity CSVs usually have 2 header lines, then the data, then a footer
-    # The data usually ends when a line starts with "The data and information..." or similar
-    # Or just keep lines that look like CSV data (start with a date)
-    
-    cleaned_lines = []
-    for line in lines:
-        if line.strip() == "":
-            continue
-        # If it starts with a date-like pattern or is part of the header
-        if line.startswith('\ufeffRun Date') or line.startswith('Run Date') or line.startswith(',') or \
-           (len(line) > 10 and line[2] == '/' and line[5] == '/'):
-            # Check for footer signals
-            if "The data and information in this report" in line or "Date downloaded" in line:
-                break
-            cleaned_lines.append(line)
-        else:
-            # If we already have some data and hit a line that doesn't fit, it might be the footer
-            if cleaned_lines and len(cleaned_lines) > 5:
-                # Basic heuristic: if it doesn't look like CSV rows anymore
-                if ',' not in line:
-                    break
-            cleaned_lines.append(line)
+    # Fidelity CSVs usually have 2 header lines, then the data, then a footer that
+    # starts with "The data and information..." or "Date downloaded". Find the footer
+    # with one regex scan and keep everything before it, minus blank lines.
+    if buf.startswith(codecs.BOM_UTF8):
+        buf = buf[len(codecs.BOM_UTF8):]
+    footer = _FOOTER_RE.search(buf)
+    if footer:
+        buf = buf[:footer.start()]
+    buf = _BLANK_LINE_RE.sub(b'', buf)
+
+    with open(output_path, 'wb') as f:
+        f.write(buf)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.writelines(cleaned_lines)
+def _configure_context(context):
+    """Applies the default timeouts and skips images/video, which the scraper never reads."""
+    context.set_default_timeout(DEFAULT_TIMEOUT_MS)
+    context.set_default_navigation_timeout(NAVIGATION_TIMEOUT_MS)
+    context.route("**/*", lambda route: route.abort()
+                  if route.request.resource_type in BLOCKED_RESOURCE_TYPES
+                  else route.continue_())
+
+def _needs_login(page):
+    return "login" in page.url.lower() or page.locator("input#userId").is_visible()
+
+def _open_activity_page(p):
+    """
+    Opens the Activity page and returns (context, page).
+    Tries the saved session in STATE_PATH first, headless (or in an already running
+    browser if CDP_URL is set); if it has expired, falls back to the persistent
+    profile and waits for a manual login, then saves the new session.
+    """
+    if os.path.exists(STATE_PATH):
+        if os.environ.get("CDP_URL"):
+            # Reuse a long-lived browser instead of booting Chromium on every run
+            browser = p.chromium.connect_over_cdp(os.environ["CDP_URL"])
+        else:
+            browser = p.chromium.launch(headless=True, args=HEADLESS_ARGS)
+        context = browser.new_context(accept_downloads=True, storage_state=STATE_PATH)
+        _configure_context(context)
+        page = context.new_page()
+        page.goto(ACTIVITY_URL)
+        if not _needs_login(page):
+            # Re-save so refreshed/rolling cookies extend the saved session
+            context.storage_state(path=STATE_PATH)
+            return context, page
+        print("Saved session has expired, logging in again...")
+        browser.close()
+    
+    # Using persistent context to save login state
+    context = p.chromium.launch_persistent_context(
+        USER_DATA_DIR,
+        headless=False,
+        slow_mo=500
+    )
+    _configure_context(context)
+    page = context.new_page()
+    
+    # 1. Navigate to Activity & Orders
+    page.goto(ACTIVITY_URL)
+    
+    # Check if we need to login
+    if _needs_login(page):
+        print("Please log in and complete MFA in the browser window...")
+        # A person is typing credentials and MFA here, so this one waits indefinitely
+        page.wait_for_url("**/portfolio/activity**", timeout=0)
+    
+    context.storage_state(path=STATE_PATH)
+    return context, page
 
 def run_scraper(start_date=None, end_date=None):
     if not start_date:
@@ -76,21 +237,7 @@ def run_scraper(start_date=None, end_date=None):
     print(f"Fetching data from {start_str} to {end_str}")
 
     with sync_playwright() as p:
-        # Using persistent context to save login state
-        context = p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            slow_mo=500
-        )
-        page = context.new_page()
-        
-        # 1. Navigate to Activity & Orders
-        page.goto("https://digital.fidelity.com/ftgw/digital/portfolio/activity")
-        
-        # Check if we need to login
-        if "login" in page.url.lower() or page.locator("input#userId").is_visible():
-            print("Please log in and complete MFA in the browser window...")
-            page.wait_for_url("**/portfolio/activity**", timeout=0)
+        context, page = _open_activity_page(p)
         
         print("Logged in. Navigating to Activity filters...")
         
@@ -98,17 +245,17 @@ def run_scraper(start_date=None, end_date=None):
         print("Waiting for time period dropdown...")
         # The button usually has "Past" (e.g., "Past 30 days")
         dropdown = page.locator("button").filter(has_text=re.compile(r"Past", re.I)).first
-        dropdown.wait_for(state="visible", timeout=30000)
+        dropdown.wait_for(state="visible")
         dropdown.click()
         
         # 3. Click Custom tab
         print("Switching to Custom tab...")
-        # Based on DOM: <label class="pvd-segment__label" for="Custom">
-        custom_tab = page.locator("label[for='Custom']").first
-        if not custom_tab.is_visible():
-            # Fallback to the ID on the apex-kit-segment
-            custom_tab = page.locator("apex-kit-segment[pvd-id='Custom']").first
-            
+        # Based on DOM: <label class="pvd-segment__label" for="Custom">,
+        # or the ID on the apex-kit-segment in other versions. One combined locator
+        # waits for whichever renders instead of probing each with is_visible().
+        custom_tab = page.locator("label[for='Custom']").or_(
+            page.locator("apex-kit-segment[pvd-id='Custom']")
+        ).first
         custom_tab.wait_for(state="visible")
         custom_tab.click()
         
@@ -122,7 +269,7 @@ def run_scraper(start_date=None, end_date=None):
         def fill_date_field(input_id, date_value_native):
             print(f"Locating field: #{input_id}")
             field = page.locator(f"#{input_id}")
-            field.wait_for(state="visible", timeout=15000)
+            field.wait_for(state="visible")
             print(f"Found {input_id}. Entering value {date_value_native}...")
             
             # For type="date", .fill("YYYY-MM-DD") is the most reliable way in Playwright
@@ -144,21 +291,27 @@ def run_scraper(start_date=None, end_date=None):
         apply_btn.wait_for(state="visible")
         apply_btn.click()
         
-        # Wait for the results to refresh
-        time.sleep(3) 
+        # Wait for the results to refresh. The loading indicator has to be seen first:
+        # waiting for it to be hidden alone passes before it has even rendered, and the
+        # export would then come from the old, unfiltered list. (Not networkidle: the
+        # page keeps polling and analytics requests open, so it never reliably settles.)
+        spinner = page.locator("[role='progressbar'], .loading-spinner").first
+        try:
+            spinner.wait_for(state="visible", timeout=SPINNER_APPEAR_TIMEOUT_MS)
+        except PlaywrightTimeoutError:
+            # Never saw it (too quick, or the markup changed): fall back to the old fixed wait
+            page.wait_for_timeout(3000)
+        spinner.wait_for(state="hidden")
         
         # 6. Click Download icon
         print("Opening Download menu...")
-        # The icon is often an SVG inside a button
-        download_btn = page.locator("button[aria-label='Download']").first
-        if not download_btn.is_visible():
-            # Try finding the icon class seen in some Fidelity versions
-            download_btn = page.locator(".activity-list--header-icon-download").first
-            
-        if not download_btn.is_visible():
-            # Last resort: find by proximity to print icon
-            download_btn = page.locator("button:has(.icon-download)").first
-
+        # The icon is often an SVG inside a button; some Fidelity versions only have
+        # the icon class, or a button wrapping .icon-download next to the print icon
+        download_btn = page.locator("button[aria-label='Download']").or_(
+            page.locator(".activity-list--header-icon-download")
+        ).or_(
+            page.locator("button:has(.icon-download)")
+        ).first
         download_btn.wait_for(state="visible")
         download_btn.click()
         
@@ -170,21 +323,36 @@ def run_scraper(start_date=None, end_date=None):
         download = download_info.value
         filename = f"Accounts_History_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}_raw.csv"
         temp_path = os.path.join(DATA_DIR, filename)
-        download.save_as(temp_path)
+        try:
+            # Move the browser's finished temp file into place: a rename on the same
+            # filesystem (shutil.move falls back to a copy across devices)
+            shutil.move(download.path(), temp_path)
+        except Exception:
+            # path() isn't available when attached to a remote browser over CDP
+            download.save_as(temp_path)
         
         print(f"Downloaded raw CSV to {temp_path}")
         
         # 8. Clean CSV
-        final_filename = f"Accounts_History ({start_date.strftime('%m%d%Y')} - {end_date.strftime('%m%d%Y')}).csv"
-        final_path = os.path.join(DATA_DIR, final_filename)
-        clean_fidelity_csv(temp_path, final_path)
-        
-        # Remove raw file
-        os.remove(temp_path)
-        
-        print(f"Cleaned and saved to {final_path}")
+        # A range with no activity still downloads a header-only export; don't add it
+        # as a history file, since any new file invalidates the cleaned-data cache.
+        # Only drop it when no Run Date parses at all, edge rows or full-column scan
+        if _max_date_for_file(temp_path) is None:
+            os.remove(temp_path)
+            print("No new transactions in this date range; nothing saved.")
+        else:
+            final_filename = f"Accounts_History ({start_date.strftime('%m%d%Y')} - {end_date.strftime('%m%d%Y')}).csv"
+            final_path = os.path.join(DATA_DIR, final_filename)
+            clean_fidelity_csv(temp_path, final_path)
+            
+            # Remove raw file
+            os.remove(temp_path)
+            
+            print(f"Cleaned and saved to {final_path}")
         
         context.close()
+        if context.browser:
+            context.browser.close()
 
 if __name__ == "__main__":
     run_scraper()
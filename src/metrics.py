@@ -1,55 +1,95 @@
+import functools
 import pandas as pd
 import numpy as np
 from scipy import optimize
 from datetime import datetime
 
+# Optional native XIRR solver; the scipy-based solver below is used without it
+try:
+    import pyxirr
+except ImportError:
+    pyxirr = None
+
+# Range of rates an XIRR is looked for in (-99.99% to +10000%); every solver path
+# only returns rates inside it, so they agree whether or not pyxirr is installed
+XIRR_MIN_RATE = -0.9999
+XIRR_MAX_RATE = 100.0
+
 def calculate_twr(portfolio_series, daily_cash_flows):
     """
     Calculate the Time-Weighted Return (TWR).
     TWR = Product (Ending Value / (Beginning Value + Net Cash Flow)) - 1
     """
-    if portfolio_series.empty or (portfolio_series <= 0).all():
+    values = portfolio_series.to_numpy(dtype=np.float64)
+    positive = values > 0
+    if not positive.any():
         return None
         
     # Trim to start from first non-zero value
-    first_idx = portfolio_series[portfolio_series > 0].index[0]
-    p_series = portfolio_series[portfolio_series.index >= first_idx]
+    first_pos = np.argmax(positive)
+    p = values[first_pos:]
     
-    if len(p_series) < 2:
+    if len(p) < 2:
         return None
         
     # Reindex flows to match portfolio dates
-    flows = daily_cash_flows.reindex(p_series.index, fill_value=0.0)
-    
-    # Previous day's value
-    prev_val = p_series.shift(1)
+    flows = daily_cash_flows.reindex(portfolio_series.index[first_pos:], fill_value=0.0).to_numpy(dtype=np.float64)
     
-    # Daily returns
-    denom = prev_val + flows
+    # Each day's return against the previous day's value plus that day's flow, done on
+    # plain arrays (the first day has no previous value, so it's skipped)
+    cur = p[1:]
+    denom = p[:-1] + flows[1:]
     
     # We only care about days where we actually have capital and a previous day value
-    # AND where denom is not zero.
-    mask = (denom > 0) & (p_series > 0) & (prev_val.notna())
+    # AND where denom is not zero. (A NaN value fails both comparisons.)
+    mask = (denom > 0) & (cur > 0)
     
-    # Calculate returns for valid days
-    day_rets = p_series[mask] / denom[mask]
-    
-    if day_rets.empty:
+    if not mask.any():
         return None
         
-    # Geometrically link
-    total_twr = day_rets.prod() - 1
+    # Geometrically link; summing logs avoids under/overflow on long series
+    total_twr = np.exp(np.log(cur[mask] / denom[mask]).sum()) - 1
     
     return total_twr
 
-def xnpv(rate, values, dates):
+def _to_days(dates):
     """
-    Calculate the Net Present Value for a schedule of cash flows.
+    Dates as a datetime64[D] array (int64 day counts underneath), the form the
+    XIRR helpers work in.
+    """
+    return np.asarray(dates, dtype='datetime64[D]')
+
+def _year_fractions(dates):
+    """
+    Years elapsed since the first date (actual/365) for each date, as a float array.
+    """
+    days = _to_days(dates)
+    return (days - days[0]).astype(np.float64) / 365.0
+
+def _npv(rate, values, years):
+    """
+    NPV of cash flows `values` at year offsets `years`; the solver objective.
     """
     if rate <= -1.0:
         return float('inf')
-    d0 = dates[0]
-    return sum([vi / (1.0 + rate)**((di - d0).days / 365.0) for vi, di in zip(values, dates)])
+    # exp(-t * log1p(r)) == (1 + r)^-t, but stays accurate for rates near zero.
+    # The sign goes on the scalar log so the array is only multiplied once, and a
+    # dot product sums the discounted flows without another temporary array
+    return values @ np.exp(years * -np.log1p(rate))
+
+def _npv_prime(rate, values, years):
+    """
+    d/dr of _npv, so Newton can use the exact slope instead of a secant.
+    """
+    if rate <= -1.0:
+        return float('inf')
+    return -((values * years) @ np.exp(years * -np.log1p(rate))) / (1.0 + rate)
+
+def xnpv(rate, values, dates):
+    """
+    Calculate the Net Present Value for a schedule of cash flows.
+    """
+    return _npv(rate, np.asarray(values, dtype=np.float64), _year_fractions(dates))
 
 def calculate_xirr(values, dates):
     """
@@ -58,21 +98,96 @@ def calculate_xirr(values, dates):
     if len(values) < 2:
         return None
         
+    # Normalize to float64 amounts and datetime64[D] day stamps once at the boundary;
+    # everything below works on these two arrays
+    values = np.asarray(values, dtype=np.float64)
+    days = _to_days(dates)
+        
     # Check if we have both positive and negative values (required for IRR)
-    if all(v >= 0 for v in values) or all(v <= 0 for v in values):
+    if (values >= 0).all() or (values <= 0).all():
+        return None
+
+    # Dashboard re-renders pass the same flows again, so the solve is memoized on
+    # the raw bytes of the flow amounts and day stamps
+    return _solve_xirr(values.tobytes(), days.tobytes())
+
+@functools.lru_cache(maxsize=64)
+def _solve_xirr(values_bytes, days_bytes):
+    """
+    Root-finding part of calculate_xirr, on flows already checked for a sign change.
+    """
+    # Convert once; the solver evaluates the NPV (and its derivative) many times
+    days = np.frombuffer(days_bytes, dtype='datetime64[D]')
+    flows = (np.frombuffer(values_bytes, dtype=np.float64), _year_fractions(days))
+
+    # All flows on the same day: the NPV is the same at every rate, so there is
+    # no rate to solve for and Newton would only burn through its retries
+    if not flows[1].any():
+        return None
+
+    # Net same-day flows in date order. By Descartes' rule of signs the number of
+    # sign changes bounds the number of rates, and exactly one change means exactly
+    # one rate, which every solver below finds. With more changes there may be
+    # several, and pyxirr and Newton can land on different ones, so pick the one
+    # nearest 10% the same way whichever solvers are installed
+    _, day_idx = np.unique(flows[1], return_inverse=True)
+    net = np.bincount(day_idx, weights=flows[0])
+    signs = np.sign(net[net != 0])
+    sign_changes = np.count_nonzero(signs[1:] != signs[:-1])
+    if sign_changes == 0:
         return None
+    if sign_changes > 1:
+        return _xirr_nearest_root(flows)
+
+    # pyxirr solves the same actual/365 equation in compiled code; keep the scipy
+    # path for when it isn't installed or finds no rate
+    if pyxirr is not None:
+        try:
+            rate = pyxirr.xirr(days, flows[0])
+        except (pyxirr.InvalidPaymentsError, ValueError):
+            rate = None
+        if rate is not None and XIRR_MIN_RATE <= rate <= XIRR_MAX_RATE:
+            return rate
 
     try:
-        # Try with a default guess
-        return optimize.newton(lambda r: xnpv(r, values, dates), 0.1)
+        # Newton from the usual guess converges in a handful of steps for
+        # ordinary deposit/value schedules
+        rate = optimize.newton(_npv, 0.1, fprime=_npv_prime, args=flows)
+        if XIRR_MIN_RATE <= rate <= XIRR_MAX_RATE:
+            return rate
     except (RuntimeError, OverflowError):
-        # Try with different guesses if it fails to converge
-        for guess in [-0.1, 0.0, 0.2, 0.5]:
-            try:
-                return optimize.newton(lambda r: xnpv(r, values, dates), guess)
-            except (RuntimeError, OverflowError):
-                continue
+        pass
+    
+    # Instead of restarting Newton from other guesses, bracket the root: if the NPV
+    # changes sign across -99.99%..1000% (widened to 10000%), Brent's method is
+    # guaranteed to converge there. With a single rate the ends only share a sign
+    # when that rate lies outside the range, which isn't a usable XIRR.
+    lo = XIRR_MIN_RATE
+    f_lo = _npv(lo, *flows)
+    for hi in (10.0, XIRR_MAX_RATE):
+        if np.sign(f_lo) * np.sign(_npv(hi, *flows)) < 0:
+            return optimize.brentq(_npv, lo, hi, args=flows)
+    return None
+
+# Rates scanned for sign changes when a schedule can have several XIRRs: evenly
+# spaced in log(1 + r) (the NPV is smooth in it) across the XIRR range
+XIRR_SCAN_RATES = np.expm1(np.linspace(np.log1p(XIRR_MIN_RATE), np.log1p(XIRR_MAX_RATE), 100))
+
+def _xirr_nearest_root(flows):
+    """
+    The XIRR nearest 10% for schedules that may have several, or None if the NPV
+    never changes sign over XIRR_SCAN_RATES.
+    """
+    values, years = flows
+    with np.errstate(over='ignore', invalid='ignore'):
+        npvs = np.exp(-np.log1p(XIRR_SCAN_RATES)[:, None] * years) @ values
+    change = np.flatnonzero(np.sign(npvs[:-1]) * np.sign(npvs[1:]) < 0)
+    if change.size == 0:
         return None
+    lo, hi = XIRR_SCAN_RATES[change], XIRR_SCAN_RATES[change + 1]
+    # Distance from 10% to each bracketing interval (zero if it contains 10%)
+    i = change[np.argmin(np.maximum(lo - 0.1, 0) + np.maximum(0.1 - hi, 0))]
+    return optimize.brentq(_npv, XIRR_SCAN_RATES[i], XIRR_SCAN_RATES[i + 1], args=flows)
 
 def calculate_cagr(start_value, end_value, years):
     """
@@ -91,51 +206,56 @@ def get_daily_cash_flows(df):
 
     # Filter for Deposits, Withdrawals, and 401k BUY contributions
     # We include BUY rows only when they belong to the 401k account (i.e., contributions)
-    transfers = df[df['Category'].isin(['DEPOSIT', 'WITHDRAWAL', 'BUY'])].copy()
+    category = df['Category']
+    if 'Account' in df.columns:
+        is_401k = df['Account'] == 'MICROSOFT 401K PLAN'
+    else:
+        is_401k = pd.Series(False, index=df.index)
+    contribution = (category == 'BUY') & is_401k
+    transfer = category.isin(['DEPOSIT', 'WITHDRAWAL'])
     
-    if transfers.empty:
+    # 401k contributions show up as negative BUY amounts, so flip them to inflows
+    amount = np.where(contribution, df['Amount'].abs(), np.where(transfer, df['Amount'], 0.0))
+    keep = amount != 0
+    if not keep.any():
         return pd.Series(dtype=float)
         
     # Create daily flows
     # Use the transactions' actual dates
-    flows = []
-    for _, row in transfers.iterrows():
-        amount = 0
-        if row['Category'] == 'BUY':
-            if row.get('Account') == 'MICROSOFT 401K PLAN':
-                amount = abs(row['Amount'])
-        else:
-            amount = row['Amount']
-        
-        if amount != 0:
-            flows.append({'Date': row['Run Date'], 'Amount': amount})
-            
-    if not flows:
-        return pd.Series(dtype=float)
-        
-    flow_df = pd.DataFrame(flows)
-    daily_flow = flow_df.groupby('Date')['Amount'].sum()
+    daily_flow = pd.Series(amount[keep], index=df['Run Date'].to_numpy()[keep], name='Amount')
+    daily_flow = daily_flow.groupby(level=0).sum()
+    daily_flow.index.name = 'Date'
     
     return daily_flow
 
 def calculate_net_invested(df):
     """
     Calculates the cumulative net invested capital (Deposits - Withdrawals) over time.
+    Only days with a flow are kept; align to a daily index with reindex(method='ffill').
     """
     daily_flow = get_daily_cash_flows(df)
     if daily_flow.empty:
         return pd.Series(dtype=float)
         
-    # Reindex to full date range to match portfolio history
-    start_date = df['Run Date'].min()
-    end_date = datetime.now()
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D')
+    # Cumulate the sparse flow days instead of a zero-filled daily calendar
+    net_invested = daily_flow.sort_index().cumsum()
     
-    daily_flow_full = daily_flow.reindex(date_range, fill_value=0.0)
-    net_invested = daily_flow_full.cumsum()
+    # Carry the latest total through to today so the chart line reaches the present
+    today = pd.Timestamp(datetime.now()).normalize()
+    if net_invested.index[-1] < today:
+        net_invested.loc[today] = net_invested.iloc[-1]
     
     return net_invested
 
+def _contains_upper(column, text):
+    """
+    Case-insensitive substring mask for a categorical column, computed once per
+    category and broadcast through the codes (missing values never match).
+    """
+    hit = column.cat.categories.astype(str).str.upper().str.contains(text, regex=False)
+    # Code -1 (missing) picks the trailing False
+    return pd.Series(np.append(hit, False)[column.cat.codes.to_numpy()], index=column.index)
+
 def calculate_net_invested_breakdown(df):
     """
     Calculates the breakdown of Net Invested:
@@ -146,27 +266,26 @@ def calculate_net_invested_breakdown(df):
     if df.empty:
         return {'transfers': 0, 'espp': 0, 'contributions': 0, 'withdrawals': 0, 'total': 0}
         
+    # Search the distinct text values only (Action is already categorical from the
+    # loader); the masks are built up front and reused below
+    description = df['Description'].astype('category')
+    action = df['Action'].astype('category')
+    is_eft = (_contains_upper(description, 'ELECTRONIC FUNDS TRANSFER') |
+              _contains_upper(action, 'ELECTRONIC FUNDS TRANSFER'))
+    is_espp = (_contains_upper(description, 'ESPP') |
+               _contains_upper(action, 'ESPP'))
+    
     # Electronic fund transfers (deposits)
-    transfers = df[
-        (df['Category'] == 'DEPOSIT') & (
-            df['Description'].str.contains('ELECTRONIC FUNDS TRANSFER', case=False, na=False) |
-            df['Action'].str.contains('ELECTRONIC FUNDS TRANSFER', case=False, na=False)
-        )
-    ]['Amount'].sum()
+    transfers = df.loc[(df['Category'] == 'DEPOSIT') & is_eft, 'Amount'].sum()
     
     # ESPP contributions (MSFT BUY)
-    espp = df[
-        (df['Category'] == 'BUY') & (df['Symbol'] == 'MSFT') & (
-            df['Description'].str.contains('ESPP', case=False, na=False) |
-            df['Action'].str.contains('ESPP', case=False, na=False)
-        )
-    ]['Amount'].abs().sum()
+    espp = df.loc[(df['Category'] == 'BUY') & (df['Symbol'] == 'MSFT') & is_espp, 'Amount'].abs().sum()
     
     # 401k contributions are BUY transactions with a non‑MSFT symbol (mutual‑fund names) and must belong to the 401k account
-    contributions = df[(df['Category'] == 'BUY') & (df['Account'] == 'MICROSOFT 401K PLAN') & (~df['Symbol'].isin(['MSFT']))]['Amount'].abs().sum()
+    contributions = df.loc[(df['Category'] == 'BUY') & (df['Account'] == 'MICROSOFT 401K PLAN') & (~df['Symbol'].isin(['MSFT'])), 'Amount'].abs().sum()
     
     # Withdrawals (including any negative DEPOSIT amounts if they exist)
-    withdrawals = df[df['Category'] == 'WITHDRAWAL']['Amount'].sum()
+    withdrawals = df.loc[df['Category'] == 'WITHDRAWAL', 'Amount'].sum()
     
     return {
         'transfers': transfers,
@@ -176,6 +295,20 @@ def calculate_net_invested_breakdown(df):
         'total': transfers + espp + contributions + withdrawals
     }
 
+def _net_flows(daily_cash_flows):
+    """
+    Date-sorted flows with one net amount per day and no zero days, so the XIRR
+    sums only run over days that actually move money.
+    """
+    if not daily_cash_flows.index.is_unique:
+        daily_cash_flows = daily_cash_flows.groupby(level=0).sum()
+    elif not daily_cash_flows.index.is_monotonic_increasing:
+        daily_cash_flows = daily_cash_flows.sort_index()
+    nonzero = daily_cash_flows.to_numpy() != 0
+    if not nonzero.all():
+        daily_cash_flows = daily_cash_flows[nonzero]
+    return daily_cash_flows
+
 def calculate_performance_metrics(portfolio_series, daily_cash_flows):
     """
     Calculates performance metrics (XIRR) for different periods.
@@ -188,59 +321,50 @@ def calculate_performance_metrics(portfolio_series, daily_cash_flows):
     
     metrics = {}
     
-    # 1. Lifetime XIRR
-    all_dates = list(daily_cash_flows.index)
-    all_values = [-v for v in daily_cash_flows.values] # Deposits are negative out-flows for IRR
+    # Flows as arrays, built once and sliced per period
+    daily_cash_flows = _net_flows(daily_cash_flows)
+    flow_dates = _to_days(daily_cash_flows.index)
+    flow_values = -daily_cash_flows.to_numpy(dtype=np.float64) # Deposits are negative out-flows for IRR
+    end_date = _to_days([current_date])
+    end_value = np.array([current_val])
     
+    # 1. Lifetime XIRR
     # Add current value as a positive in-flow at the end
-    all_dates.append(current_date)
-    all_values.append(current_val)
+    all_dates = np.concatenate([flow_dates, end_date])
+    all_values = np.concatenate([flow_values, end_value])
     
     metrics['Lifetime_XIRR'] = calculate_xirr(all_values, all_dates)
     metrics['Lifetime_TWR'] = calculate_twr(portfolio_series, daily_cash_flows)
     
     # 2. Periodic Metrics (1Y, YTD, etc.)
     periods = {
-        '1Y': pd.Timedelta(days=365),
-        'YTD': None
+        '1Y': current_date - pd.Timedelta(days=365),
+        'YTD': pd.Timestamp(year=current_date.year, month=1, day=1)
     }
     
-    for label, delta in periods.items():
-        if label == 'YTD':
-            start_date = pd.Timestamp(year=current_date.year, month=1, day=1)
-        else:
-            start_date = current_date - delta
-            
-        # Find portfolio value at start_date
-        idx = portfolio_series.index.searchsorted(start_date)
+    # Find the portfolio value at every window's start date with one searchsorted call
+    start_positions = portfolio_series.index.searchsorted(pd.DatetimeIndex(list(periods.values())))
+    
+    for label, idx in zip(periods, start_positions):
         if idx < len(portfolio_series):
             actual_start_date = portfolio_series.index[idx]
             
             # Period data
-            p_series = portfolio_series[portfolio_series.index >= actual_start_date]
-            p_flows = daily_cash_flows[daily_cash_flows.index >= actual_start_date].copy()
-            
-            # For XIRR, the "start value" is treated as the first deposit
-            p_xirr_values = [-p_series.iloc[0]]
-            p_xirr_dates = [actual_start_date]
+            p_series = portfolio_series.iloc[idx:]
             
-            # Intermediate flows (exclude the very first day's flow if it's already in p_series.iloc[0])
-            # Wait, daily_cash_flows already has the external flow. 
-            # If we start "as of" start_date, the flow *on* that day is usually included in start_val.
-            # So we only include flows *after* start_date.
-            sub_flows = daily_cash_flows[daily_cash_flows.index > actual_start_date]
-            for d, v in sub_flows.items():
-                p_xirr_values.append(-v)
-                p_xirr_dates.append(d)
-                
-            p_xirr_values.append(current_val)
-            p_xirr_dates.append(current_date)
+            # For XIRR, the "start value" is treated as the first deposit.
+            # The flow *on* the start date is already included in the start value,
+            # so only flows *after* it are added.
+            start_day = _to_days([actual_start_date])
+            k = flow_dates.searchsorted(start_day[0], side='right')
+            p_xirr_values = np.concatenate([[-p_series.iloc[0]], flow_values[k:], end_value])
+            p_xirr_dates = np.concatenate([start_day, flow_dates[k:], end_date])
             
             metrics[f'{label}_XIRR'] = calculate_xirr(p_xirr_values, p_xirr_dates)
             
             # For TWR, we just use the subset
-            # But the very first flow in p_flows is technically external to the sub-period's return
             # TWR sub-period starts at the *end* of the first day.
+            sub_flows = daily_cash_flows.iloc[k:]
             metrics[f'{label}_TWR'] = calculate_twr(p_series, sub_flows)
         else:
             metrics[f'{label}_XIRR'] = None
@@ -261,60 +385,69 @@ def calculate_yearly_returns(portfolio_series, daily_cash_flows):
     yearly_metrics = []
     
     # Exclude current year as it's partial/non-representative for annual comparison
-    for year in range(start_year, current_year):
-        year_start = pd.Timestamp(year=year, month=1, day=1)
-        year_end = pd.Timestamp(year=year, month=12, day=31)
-        
-        # Adjust start/end to data range
-        calc_start = max(year_start, portfolio_series.index.min())
-        calc_end = min(year_end, portfolio_series.index.max())
+    years = list(range(start_year, current_year))
+    if not years:
+        return []
+    
+    # Adjust each year's start/end to the data range, then locate all of them in the
+    # portfolio and flow indexes with one searchsorted call each instead of per year
+    index = portfolio_series.index
+    first_date, last_date = index.min(), index.max()
+    calc_starts = pd.DatetimeIndex([max(pd.Timestamp(year=y, month=1, day=1), first_date) for y in years])
+    calc_ends = pd.DatetimeIndex([min(pd.Timestamp(year=y, month=12, day=31), last_date) for y in years])
+    start_pos = index.searchsorted(calc_starts)
+    end_pos = index.searchsorted(calc_ends)
+    end_pos_incl = index.searchsorted(calc_ends, side='right')
+    
+    daily_cash_flows = _net_flows(daily_cash_flows)
+    flow_lo = daily_cash_flows.index.searchsorted(calc_starts)
+    flow_hi = daily_cash_flows.index.searchsorted(calc_ends, side='right')
+    
+    # XIRR inputs as day-stamp / float arrays, sliced per year
+    flow_days = _to_days(daily_cash_flows.index)
+    flow_values = -daily_cash_flows.to_numpy(dtype=np.float64)
+    start_days = _to_days(calc_starts)
+    end_days = _to_days(calc_ends)
+    
+    for i, year in enumerate(years):
+        calc_start, calc_end = calc_starts[i], calc_ends[i]
         
         if calc_start >= calc_end:
              continue
              
         # Find portfolio value at calc_start
         # If calc_start is absolute min, start_val is 0
-        if calc_start == portfolio_series.index.min():
+        if calc_start == first_date:
             start_val = 0
         else:
             # Value at the end of the day BEFORE calc_start
-            idx = portfolio_series.index.searchsorted(calc_start)
+            idx = start_pos[i]
             if idx > 0:
                 start_val = portfolio_series.iloc[idx-1]
             else:
                 start_val = portfolio_series.iloc[0]
             
         # End val
-        idx_end = portfolio_series.index.searchsorted(calc_end)
+        idx_end = end_pos[i]
         end_val = portfolio_series.iloc[idx_end] if idx_end < len(portfolio_series) else portfolio_series.iloc[-1]
         
         # Flows within the year
-        year_flows = daily_cash_flows[(daily_cash_flows.index >= calc_start) & (daily_cash_flows.index <= calc_end)]
+        lo, hi = flow_lo[i], flow_hi[i]
+        year_flows = daily_cash_flows.iloc[lo:hi]
         
         # XIRR
-        xirr_values = []
-        xirr_dates = []
-        
-        if start_val > 0:
-            xirr_values.append(-start_val)
-            xirr_dates.append(calc_start)
-        
-        # Intermediate flows
-        for d, v in year_flows.items():
-            # If we already have a start_val on this date, we don't want to double count
-            # Actually, the start_val is at the BEGINNING of calc_start (end of prev day)
-            # and year_flows are the flows ON calc_start. So we should include them.
-            xirr_values.append(-v)
-            xirr_dates.append(d)
-            
-        xirr_values.append(end_val)
-        xirr_dates.append(calc_end)
+        # Opening value (if any), then the intermediate flows, then the closing value.
+        # The start_val is at the BEGINNING of calc_start (end of prev day)
+        # and year_flows are the flows ON calc_start. So we should include them.
+        n_open = 1 if start_val > 0 else 0
+        xirr_values = np.concatenate([[-start_val] * n_open, flow_values[lo:hi], [end_val]])
+        xirr_dates = np.concatenate([start_days[i:i + n_open], flow_days[lo:hi], end_days[i:i + 1]])
         
         year_xirr = calculate_xirr(xirr_values, xirr_dates)
         
         # TWR
         # Portfolio subset
-        p_sub = portfolio_series[(portfolio_series.index >= calc_start) & (portfolio_series.index <= calc_end)]
+        p_sub = portfolio_series.iloc[start_pos[i]:end_pos_incl[i]]
         # TWR needs the flow on the same day as the portfolio value change
         year_twr = calculate_twr(p_sub, year_flows)
         
@@ -336,71 +469,76 @@ def calculate_cost_basis(df):
     if df.empty:
         return [], []
 
-    # Sort by date and reset index so iterrows() processes in correct order
+    # Sort by date so transactions are processed in correct order
     # Preserve original CSV order for transactions on the same day by using original index as tiebreaker
     df = df.reset_index(drop=False).rename(columns={'index': 'original_index'})
     df = df.sort_values(['Run Date', 'original_index']).reset_index(drop=True)
     
-    # Track lots for each symbol: list of (date, qty, price_per_share)
-    lots = {} 
+    # Pull the columns out as plain arrays once and walk those, instead of building
+    # a Series per row with iterrows(). Symbols become integer ids in order of first
+    # appearance (-1 for missing), so lots are indexed by position, not by name.
+    symbols = df['Symbol'].astype(object)
+    sym_ids, sym_names = pd.factorize(symbols.where(symbols.notna() & (symbols != ''), None))
+    
+    # Only rows with a symbol and a lot-changing action matter, so drop the rest up
+    # front rather than skipping them inside the loop
+    keep = (sym_ids >= 0) & df['Category'].isin(['BUY', 'REINVESTMENT', 'DISTRIBUTION', 'SELL']).to_numpy()
+    sym_ids = sym_ids[keep]
+    actions = df['Category'].astype(object).to_numpy()[keep]
+    qtys = df['Quantity'].to_numpy(dtype=np.float64)[keep]
+    amounts = df['Amount'].to_numpy(dtype=np.float64)[keep] # Total amount (negative for buy, positive for sell usually)
+    run_dates = pd.DatetimeIndex(df['Run Date'])[keep]
+    
+    # Track lots for each symbol id as parallel qty / price_per_share lists plus a head
+    # pointer to the oldest open lot; FIFO consumption just advances the pointer
+    lot_qty = [[] for _ in sym_names]
+    lot_cost = [[] for _ in sym_names]
+    lot_head = [0] * len(sym_names)
     realized_pnl = []
     
-    for _, row in df.iterrows():
-        symbol = row['Symbol']
-        if pd.isna(symbol) or symbol == '':
-            continue
-            
-        action = row['Category']
-        qty = row['Quantity']
-        amount = row['Amount'] # Total amount (negative for buy, positive for sell usually)
-        date = row['Run Date']
-        
-        if symbol not in lots:
-            lots[symbol] = []
-            
+    for i, (sym_id, action, qty, amount) in enumerate(zip(sym_ids, actions, qtys, amounts)):
         if action in ['BUY', 'REINVESTMENT']:
             # Add a new lot
             # Cost per share = abs(amount) / qty
             # Note: Amount is negative for buys.
             cost_per_share = abs(amount) / qty if qty != 0 else 0
-            lots[symbol].append({'date': date, 'qty': qty, 'cost': cost_per_share})
+            lot_qty[sym_id].append(qty)
+            lot_cost[sym_id].append(cost_per_share)
             
         elif action == 'DISTRIBUTION':
             # Stock split distribution - shares received at $0 cost
             # These are free shares from stock splits
-            lots[symbol].append({'date': date, 'qty': qty, 'cost': 0})
+            lot_qty[sym_id].append(qty)
+            lot_cost[sym_id].append(0)
             
         elif action == 'SELL':
             # FIFO matching
-            qty_to_sell = abs(qty) # Sell qty is negative in CSV? 
-            # In data_loader, we didn't check sign of qty for SELL. 
-            # Usually in these CSVs, sell qty is negative. Let's assume abs().
-            
-            sell_price = amount / qty_to_sell if qty_to_sell != 0 else 0
-            # Wait, if amount is positive for sell, and qty is negative, price is negative?
-            # Let's check CSV. Line 8: "YOU SOLD ... -19 ... 1525.96".
-            # So Qty is negative, Amount is positive.
-            # Sell Price = 1525.96 / 19 = 80.31.
-            sell_price = abs(amount / qty)
+            # Sell qty is negative in the CSV and Amount is positive
+            # (e.g. "YOU SOLD ... -19 ... 1525.96" -> Sell Price = 1525.96 / 19 = 80.31)
+            qty_to_sell = abs(qty)
+            sell_price = abs(amount / qty) if qty != 0 else 0
             
             cost_basis = 0
             shares_sold_so_far = 0
             
-            while qty_to_sell > 0 and lots[symbol]:
-                current_lot = lots[symbol][0]
+            qtys_open, costs_open = lot_qty[sym_id], lot_cost[sym_id]
+            head = lot_head[sym_id]
+            while qty_to_sell > 0 and head < len(qtys_open):
+                lot = qtys_open[head]
                 
-                if current_lot['qty'] > qty_to_sell:
+                if lot > qty_to_sell:
                     # Partial lot sale
-                    cost_basis += qty_to_sell * current_lot['cost']
-                    current_lot['qty'] -= qty_to_sell
+                    cost_basis += qty_to_sell * costs_open[head]
+                    qtys_open[head] -= qty_to_sell
                     shares_sold_so_far += qty_to_sell
                     qty_to_sell = 0
                 else:
                     # Full lot sale
-                    cost_basis += current_lot['qty'] * current_lot['cost']
-                    shares_sold_so_far += current_lot['qty']
-                    qty_to_sell -= current_lot['qty']
-                    lots[symbol].pop(0)
+                    cost_basis += lot * costs_open[head]
+                    shares_sold_so_far += lot
+                    qty_to_sell -= lot
+                    head += 1
+            lot_head[sym_id] = head
             
             # Record Realized P/L
             # Proceeds = shares_sold_so_far * sell_price
@@ -409,8 +547,8 @@ def calculate_cost_basis(df):
             pnl = proceeds - cost_basis
             
             realized_pnl.append({
-                'Symbol': symbol,
-                'Date': date,
+                'Symbol': sym_names[sym_id],
+                'Date': run_dates[i],
                 'Qty': shares_sold_so_far,
                 'Sell Price': sell_price,
                 'Cost Basis': cost_basis,
@@ -419,17 +557,28 @@ def calculate_cost_basis(df):
             })
 
     # Construct Current Holdings from remaining lots
-    current_holdings = []
-    for symbol, remaining_lots in lots.items():
-        total_qty = sum(lot['qty'] for lot in remaining_lots)
-        if total_qty > 0.01: # Filter out dust (increased threshold to handle rounding errors)
-            total_cost = sum(lot['qty'] * lot['cost'] for lot in remaining_lots)
-            avg_cost = total_cost / total_qty
-            current_holdings.append({
-                'Symbol': symbol,
-                'Quantity': total_qty,
-                'Avg Cost': avg_cost,
-                'Total Cost': total_cost
-            })
+    # Flatten every symbol's open lots into one array and sum them per symbol with a
+    # single segmented reduction (symbols with no open lots are left out, since
+    # reduceat can't produce an empty segment)
+    open_counts = np.array([len(q) - head for q, head in zip(lot_qty, lot_head)], dtype=np.int64)
+    open_ids = np.flatnonzero(open_counts > 0)
+    if open_ids.size == 0:
+        return [], realized_pnl
+    flat_qty = np.array([q for s in open_ids for q in lot_qty[s][lot_head[s]:]], dtype=np.float64)
+    flat_cost = np.array([c for s in open_ids for c in lot_cost[s][lot_head[s]:]], dtype=np.float64)
+    offsets = np.concatenate([[0], np.cumsum(open_counts[open_ids])[:-1]])
+    total_qtys = np.add.reduceat(flat_qty, offsets)
+    total_costs = np.add.reduceat(flat_qty * flat_cost, offsets)
+    
+    current_holdings = [
+        {
+            'Symbol': sym_names[s],
+            'Quantity': total_qty,
+            'Avg Cost': total_cost / total_qty,
+            'Total Cost': total_cost
+        }
+        for s, total_qty, total_cost in zip(open_ids, total_qtys, total_costs)
+        if total_qty > 0.01 # Filter out dust (increased threshold to handle rounding errors)
+    ]
             
     return current_holdings, realized_pnl
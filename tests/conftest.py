@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+import pandas as pd
+import numpy as np
+import pytest
+
+# Make the modules in src/ importable by the tests, wherever pytest is run from
+SRC_DIR = str(Path(__file__).resolve().parent.parent / 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+@pytest.fixture(scope="session")
+def periodic_portfolio():
+    """
+    Daily portfolio values and cash flows for one year with two deposits.
+    Built once per test session and shared by every test that asks for it.
+    """
+    # Timeline:
+    # 2023-01-01: Deposit 1000 (Value 1000)
+    # 2023-07-01: Deposit 500 (Value 1500 + profit/loss)
+    # 2024-01-01: Final Value 2000
+    
+    dates = pd.date_range('2023-01-01', '2024-01-01', freq='D')
+    second_deposit = pd.Timestamp('2023-07-01')
+    # Simple linear growth for testing, computed for all days at once:
+    # the base value grows 10% annually, and the July deposit grows the same way from its own date.
+    # The dates are daily, so days since the deposit are just positions past its index.
+    i = np.arange(len(dates))
+    vals = 1000.0 * (1.0 + 0.1 * i / 365.0)
+    split = dates.searchsorted(second_deposit)
+    vals[split:] += 500.0 * (1.0 + 0.1 * (i[split:] - split) / 365.0)
+    portfolio_series = pd.Series(vals, index=dates)
+        
+    daily_cash_flows = pd.Series({
+        pd.Timestamp('2023-01-01'): 1000.0,
+        second_deposit: 500.0
+    })
+    
+    return portfolio_series, daily_cash_flows